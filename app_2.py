@@ -6,13 +6,31 @@ import argparse
 import signal
 import sys
 import subprocess
+from retention import add_retention_arguments, retention_from_args, PHOTO_BYTES
+from deflicker import record_luminance, create_deflickered_video
+from daynight import (add_daynight_arguments, daynight_from_args, probe_brightness,
+                      apply_night_controls, restore_auto_controls, PROBE_SIZE)
+from offload import OffloadClient, join_segments
+from burst import BurstCapture, format_report, MB
+from metadata import capture_with_metadata
 
 class TimelapseCamera:
-    def __init__(self, interval=60, output_dir='timelapse'):
+    def __init__(self, interval=60, output_dir='timelapse', retention=None,
+                 deflicker=False, deflicker_window=15, daynight=None, offload=None,
+                 burst=0, burst_fps=10, burst_max_bytes=200 * MB):
         self.interval = interval
         self.output_dir = output_dir
         self.running = False
         self.picam2 = None
+        self.retention = retention
+        self.deflicker = deflicker
+        self.deflicker_window = deflicker_window
+        self.daynight = daynight
+        self.offload = offload
+        self.burst = burst
+        self.burst_fps = burst_fps
+        self.burst_max_bytes = burst_max_bytes
+        self.burst_capture = None
         
         # Make sure the directory exists
         if not os.path.exists(output_dir):
@@ -23,16 +41,63 @@ class TimelapseCamera:
         
     def init_camera(self):
         self.picam2 = Picamera2()
-        config = self.picam2.create_still_configuration(main={"size": (2304, 1296)})
+        # A small lores stream for the day/night probe - the still stream is full resolution
+        lores = {"size": PROBE_SIZE} if self.daynight else None
+        config = self.picam2.create_still_configuration(main={"size": (2304, 1296)}, lores=lores)
         self.picam2.configure(config)
         self.picam2.start()
         time.sleep(2)  # Give camera time to initialize
+        if self.burst:
+            self.burst_capture = BurstCapture(self.picam2, self.burst_max_bytes)
         
     def take_photo(self):
+        # Check the light level from frame metadata before paying for a still
+        if self.daynight:
+            self.daynight.update(*probe_brightness(self.picam2))
+            if not self.daynight.should_capture():
+                return
+        # Clean up old photos first; skip the shot if the card is still full.
+        # A burst writes self.burst full resolution photos.
+        needed = PHOTO_BYTES * max(self.burst, 1)
+        if self.retention and not self.retention.make_room(needed):
+            print("Not enough free space, skipping photo")
+            return
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.output_dir}/timelapse_{timestamp}.jpg"
-        self.picam2.capture_file(filename)
-        print(f"Photo taken: {filename}")
+        started = time.time()
+        # Night exposure applies to a burst the same way as to a single still
+        night_controls = self.daynight.night_controls() if self.daynight else None
+        if night_controls:
+            apply_night_controls(self.picam2, night_controls)
+        try:
+            if self.burst_capture:
+                self.take_burst(timestamp)
+            else:
+                # Exposure, gain and lux go into the EXIF block in the same write
+                capture_with_metadata(self.picam2, filename)
+        finally:
+            if night_controls:
+                restore_auto_controls(self.picam2)
+        if self.daynight:
+            self.daynight.record_capture(time.time() - started)
+        if not self.burst_capture:
+            print(f"Photo taken: {filename}")
+            self.photo_saved(filename)
+
+    def take_burst(self, timestamp):
+        # Frames go to memory first, JPEG encoding and writing run in the background
+        result = self.burst_capture.capture(self.burst, self.burst_fps)
+        print(format_report(result))
+        self.burst_capture.write_async(result, self.output_dir, f"timelapse_{timestamp}",
+                                       on_written=self.photo_saved)
+
+    def photo_saved(self, filename):
+        if self.retention:
+            self.retention.add(filename)
+        if self.deflicker:
+            record_luminance(self.output_dir, filename)
+        if self.offload:
+            self.offload.submit(filename)
         
     def create_video(self):
         print("\nCreating video from collected photos...")
@@ -46,6 +111,27 @@ class TimelapseCamera:
             return
         
         try:
+            if self.offload:
+                # Frames were encoded by the worker, only join the segments here
+                print("Waiting for the encode worker...")
+                if not self.offload.flush(timeout=600):
+                    print("Encode worker did not finish, remaining frames stay in the folder")
+                if not self.offload.segments:
+                    print("No segments received from the encode worker!")
+                    return
+                join_segments(self.offload.segments, video_name)
+                print(f"\nVideo has been created: {video_name}")
+                print(f"Number of segments used: {len(self.offload.segments)}")
+                return
+
+            if self.deflicker:
+                # Gain correction is applied while frames are streamed into ffmpeg
+                count = create_deflickered_video(self.output_dir, photos, video_name,
+                                                 framerate=24, window=self.deflicker_window)
+                print(f"\nVideo has been created: {video_name}")
+                print(f"Number of photos used: {count} (deflickered)")
+                return
+
             # Use ffmpeg to create video
             cmd = [
                 'ffmpeg',
@@ -76,8 +162,15 @@ class TimelapseCamera:
                 self.take_photo()
                 time.sleep(self.interval)
         finally:
+            if self.burst_capture:
+                self.burst_capture.wait()
+            if self.retention:
+                # A segment still being archived would delete photos under the video
+                self.retention.wait()
             if self.picam2:
                 self.picam2.close()
+            if self.daynight:
+                print(f"Day/night policy: {self.daynight.report()}")
             # Create video after recording is finished
             self.create_video()
                 
@@ -91,10 +184,37 @@ def main():
                         help='Interval between photos in seconds (default: 60)')
     parser.add_argument('-o', '--output', type=str, default='timelapse',
                         help='Output folder for photos (default: timelapse)')
+    parser.add_argument('--deflicker', action='store_true',
+                        help='Record frame brightness and remove flicker when creating the video')
+    parser.add_argument('--deflicker-window', type=int, default=15,
+                        help='Number of frames averaged by --deflicker (default: 15)')
+    add_retention_arguments(parser)
+    add_daynight_arguments(parser)
+    parser.add_argument('--offload', type=str, default=None,
+                        help='Encode worker address (e.g. 192.168.1.10:8100) - video is encoded there')
+    parser.add_argument('--offload-batch', type=int, default=240,
+                        help='Photos per segment sent to the encode worker (default: 240)')
+    parser.add_argument('--burst', type=int, default=0,
+                        help='Take a burst of N photos at every interval (default: off)')
+    parser.add_argument('--burst-fps', type=float, default=10,
+                        help='Photos per second in a burst (default: 10)')
+    parser.add_argument('--burst-mem', type=int, default=200,
+                        help='Memory limit for burst frames in MB (default: 200)')
     
     args = parser.parse_args()
     
-    camera = TimelapseCamera(interval=args.interval, output_dir=args.output)
+    os.makedirs(args.output, exist_ok=True)
+    retention = retention_from_args(args, args.output)
+    offload = None
+    if args.offload:
+        offload = OffloadClient(args.offload, os.path.join(args.output, 'segments'),
+                                batch_size=args.offload_batch)
+    camera = TimelapseCamera(interval=args.interval, output_dir=args.output,
+                             retention=retention, deflicker=args.deflicker,
+                             deflicker_window=args.deflicker_window,
+                             daynight=daynight_from_args(args), offload=offload,
+                             burst=args.burst, burst_fps=args.burst_fps,
+                             burst_max_bytes=args.burst_mem * MB)
     camera.start()
 
 if __name__ == '__main__':
@@ -1,4 +1,4 @@
-from flask import Flask, Response, render_template_string
+from flask import Flask, Response, render_template_string, request
 from picamera2 import Picamera2
 import cv2
 import time
@@ -8,14 +8,13 @@ import Adafruit_DHT
 import json
 import os
 from collections import deque
-import plotly.express as px
-import pandas as pd
-import plotly.utils
 from datetime import datetime
 import argparse
 import smbus2 as smbus
+from assets import register_assets
 
 app = Flask(__name__)
+register_assets(app)
 
 # Konfiguracja kamery
 picam2 = Picamera2()
@@ -124,15 +123,25 @@ def capture_timelapse(output_dir, interval):
             print(f"Error in timelapse capture: {e}")
 
 def update_measurements():
+    seq = 0
     while True:
         temp, hum = get_dht11_data()
+        seq += 1
         measurements.append({
+            'seq': seq,  # Panel pobiera tylko punkty z seq większym niż ostatni
             'timestamp': datetime.now().strftime('%H:%M:%S'),
             'temperature': temp,
             'humidity': hum
         })
         time.sleep(2)
 
+def latest_measurement():
+    # Ostatni odczyt z wątku pomiarów - /data nie czyta czujnika przy każdym zapytaniu
+    if measurements:
+        last = measurements[-1]
+        return last['temperature'], last['humidity']
+    return get_dht11_data()
+
 def update_lcd_display():
     lcd = LCD()
     lcd.init()
@@ -185,79 +194,8 @@ HTML_TEMPLATE = """
 <head>
     <title>Raspberry Pi Monitor</title>
     <meta charset="utf-8">
-    <style>
-        body { 
-            font-family: Arial, sans-serif; 
-            margin: 20px; 
-            background-color: #f0f0f0;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        .camera-view {
-            text-align: center;
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-        .stat-box {
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            text-align: center;
-        }
-        .graph {
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        img {
-            max-width: 100%;
-            border-radius: 5px;
-        }
-        h1, h2 { color: #333; }
-        .value { 
-            font-size: 24px; 
-            font-weight: bold;
-            color: #2196F3;
-        }
-    </style>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-    <script>
-        function updateData() {
-            fetch('/data')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('temp').innerText = data.temperature.toFixed(1) + '°C';
-                    document.getElementById('hum').innerText = data.humidity.toFixed(1) + '%';
-                    document.getElementById('photos').innerText = data.photo_count;
-                    document.getElementById('time').innerText = data.current_time;
-                });
-        }
-
-        function updateGraphs() {
-            fetch('/graph-data')
-                .then(response => response.json())
-                .then(data => {
-                    Plotly.newPlot('temp-graph', data.temp_graph);
-                    Plotly.newPlot('hum-graph', data.hum_graph);
-                });
-        }
-
-        // Aktualizuj dane co sekundę
-        setInterval(updateData, 1000);
-        // Aktualizuj wykresy co 10 sekund
-        setInterval(updateGraphs, 10000);
-    </script>
+    <link rel="stylesheet" href="{{ asset_url('dashboard.css') }}">
+    <script src="{{ asset_url('dashboard.js') }}" defer></script>
 </head>
 <body>
     <div class="container">
@@ -289,12 +227,12 @@ HTML_TEMPLATE = """
 
         <div class="graph">
             <h2>Wykres Temperatury</h2>
-            <div id="temp-graph"></div>
+            <canvas id="temp-graph"></canvas>
         </div>
 
         <div class="graph">
             <h2>Wykres Wilgotności</h2>
-            <div id="hum-graph"></div>
+            <canvas id="hum-graph"></canvas>
         </div>
     </div>
 </body>
@@ -312,7 +250,7 @@ def video_feed():
 
 @app.route('/data')
 def data():
-    temp, hum = get_dht11_data()
+    temp, hum = latest_measurement()
     return json.dumps({
         'temperature': temp,
         'humidity': hum,
@@ -322,17 +260,21 @@ def data():
 
 @app.route('/graph-data')
 def graph_data():
-    df = pd.DataFrame(list(measurements))
-    
-    if len(df) > 0:
-        temp_fig = px.line(df, x='timestamp', y='temperature', title='Temperatura')
-        hum_fig = px.line(df, x='timestamp', y='humidity', title='Wilgotność')
-        
-        return json.dumps({
-            'temp_graph': temp_fig.to_dict(),
-            'hum_graph': hum_fig.to_dict()
-        })
-    return json.dumps({})
+    # Tylko nowe punkty - wykres w przeglądarce dopisuje je do istniejących
+    since = request.args.get('since', 0, type=int)
+    points = list(measurements)
+    newest = points[-1]['seq'] if points else 0
+    # seq liczy od 1 po restarcie serwera - wtedy całość, przeglądarka czyści wykres
+    reset = since > newest
+    if not reset:
+        points = [m for m in points if m['seq'] > since]
+    return json.dumps({
+        'reset': reset,
+        'last': points[-1]['seq'] if points else (0 if reset else since),
+        't': [m['timestamp'] for m in points],
+        'temperature': [m['temperature'] for m in points],
+        'humidity': [m['humidity'] for m in points]
+    })
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
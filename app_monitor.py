@@ -1,4 +1,4 @@
-from flask import Flask, Response, render_template_string
+from flask import Flask, Response, render_template_string, request, abort, send_from_directory
 from picamera2 import Picamera2
 import cv2
 import time
@@ -8,31 +8,52 @@ import Adafruit_DHT
 import json
 import os
 import argparse
+import re
 from collections import deque
-import plotly.express as px
-import pandas as pd
-import plotly.utils
 from datetime import datetime
 from smbus2 import SMBus
+from retention import add_retention_arguments, retention_from_args
+from thumbnails import FrameIndex, ThumbnailCache
+from assets import register_assets
+from overlay import overlay_for_frame, sensor_text
+from metadata import capture_with_metadata
+from history import HistoryLog, parse_time, iter_lines, export_stream
+from daynight import (add_daynight_arguments, daynight_from_args, probe_brightness,
+                      apply_night_controls, restore_auto_controls, PROBE_SIZE)
 
 # Parsowanie argumentów
 parser = argparse.ArgumentParser()
 parser.add_argument('-o', '--output', default='timelapse_nowy', help='Folder na zdjęcia timelapsu')
 parser.add_argument('-i', '--interval', type=int, default=60, help='Interwał między zdjęciami (sekundy)')
+add_retention_arguments(parser)
+add_daynight_arguments(parser)
+parser.add_argument('--history', default='history', help='Folder na historię pomiarów i zdjęć (CSV, plik na dzień)')
+parser.add_argument('--history-days', type=int, default=30, help='Ile dni historii trzymać na karcie (0 = bez limitu)')
+parser.add_argument('--overlay', action='store_true', help='Data, temperatura i wilgotność na zdjęciach i podglądzie')
 args = parser.parse_args()
 
 app = Flask(__name__)
+register_assets(app)
 
 # Konfiguracja kamery
 picam2 = Picamera2()
-preview_config = picam2.create_preview_configuration(main={"size": (800, 600)})
+# Strumień lores tylko do pomiaru jasności (--day-night), gdy czujnik nie podaje Lux
+preview_config = picam2.create_preview_configuration(
+    main={"size": (800, 600)}, lores={"size": PROBE_SIZE} if args.day_night else None)
 still_config = picam2.create_still_configuration(main={"size": (2304, 1296)})
 camera_lock = threading.Lock()
 
 # Zmienne globalne
 measurements = deque(maxlen=100)  # Przechowuje ostatnie 100 pomiarów
 output_folder = args.output
+IMG_NAME = re.compile(r'img_(\d+)\.jpg$')  # img_001.jpg ... img_1000.jpg
 interval = args.interval
+retention = None  # Limit miejsca zajmowanego przez zdjęcia (retention.py)
+frame_index = FrameIndex(output_folder)
+thumbnails = ThumbnailCache(output_folder)
+daynight = daynight_from_args(args)  # Rzadsze zdjęcia w nocy (daynight.py)
+overlays = {}  # Nakładki tekstowe dla każdej rozdzielczości (overlay.py)
+history = HistoryLog(args.history, max_days=args.history_days)  # Pełna historia na karcie, pobierana przez /export
 
 # Konfiguracja LCD
 LCD_ADDR = 0x27
@@ -103,27 +124,76 @@ def update_lcd():
             print(f"Błąd aktualizacji LCD: {e}")
             time.sleep(1)
 
+def should_take_photo():
+    # Pomiar jasności z metadanych podglądu - bez robienia pełnego zdjęcia
+    if daynight is not None:
+        with camera_lock:
+            if not picam2.started:
+                picam2.configure(preview_config)
+                picam2.start()
+            daynight.update(*probe_brightness(picam2))
+        if not daynight.should_capture():
+            return False
+    # Sprzątanie starych zdjęć; przy pełnej karcie pomiń zdjęcie
+    if not retention.make_room():
+        print("Za mało miejsca na karcie - pomijam zdjęcie")
+        return False
+    return True
+
+def frame_removed(path):
+    # Wywoływane przez retention.py po usunięciu zdjęcia
+    frame_index.remove(path)
+    thumbnails.discard(path)
+
 def capture_timelapse():
+    global retention
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
-    photo_counter = len([f for f in os.listdir(output_folder) if f.endswith('.jpg')])
+    # Numeracja od najwyższego istniejącego numeru - po usunięciu zdjęć przez retencję
+    # liczba plików jest mniejsza i nowe zdjęcia nadpisywałyby ostatnie
+    numbers = [int(m.group(1)) for m in map(IMG_NAME.match, os.listdir(output_folder)) if m]
+    photo_counter = max(numbers, default=0)
+    retention = retention_from_args(args, output_folder, on_remove=frame_removed)
     
     while True:
         try:
-            with camera_lock:
-                picam2.configure(still_config)
-                picam2.start()
-                time.sleep(2)  # Czas na dostosowanie ekspozycji
-                
-                # Zrób zdjęcie
-                photo_counter += 1
-                filename = os.path.join(output_folder, f'img_{photo_counter:03d}.jpg')
-                picam2.capture_file(filename)
-                print(f"Zapisano zdjęcie: {filename}")
-                
-                picam2.configure(preview_config)
-                picam2.start()
+            if should_take_photo():
+                started = time.time()
+                with camera_lock:
+                    picam2.configure(still_config)
+                    picam2.start()
+                    time.sleep(2)  # Czas na dostosowanie ekspozycji
+                    night_controls = daynight.night_controls() if daynight else None
+                    if night_controls:
+                        apply_night_controls(picam2, night_controls)
+                    
+                    # Zrób zdjęcie
+                    photo_counter += 1
+                    filename = os.path.join(output_folder, f'img_{photo_counter:03d}.jpg')
+                    try:
+                        # EXIF (ekspozycja, wzmocnienie, lux, DHT11) zapisywany razem z JPEG;
+                        # nakładka rysowana w buforze kamery, z którego od razu powstaje plik
+                        info = capture_with_metadata(picam2, filename, sensor=latest_measurement(),
+                                                     before_save=stamp if args.overlay else None)
+                    finally:
+                        if night_controls:
+                            restore_auto_controls(picam2)
+                    print(f"Zapisano zdjęcie: {filename}")
+                    
+                    picam2.configure(preview_config)
+                    picam2.start()
+                if daynight:
+                    daynight.record_capture(time.time() - started)
+                history.append('capture', file=os.path.basename(filename),
+                               exposure_us=info.get('exposure_us'), lux=info.get('lux'))
+                retention.add(filename)
+                frame_index.add(filename)  # Galeria bez ponownego listowania folderu
+                # Miniatura od razu po zapisie - plik jest jeszcze w cache systemu
+                try:
+                    thumbnails.get(os.path.basename(filename))
+                except Exception as e:
+                    print(f"Błąd tworzenia miniatury: {e}")
         except Exception as e:
             print(f"Błąd podczas robienia zdjęcia: {e}")
         
@@ -136,6 +206,9 @@ def get_dht11_data():
     return 0, 0
 
 def get_timelapse_info():
+    # Licznik z retention.py - bez listowania folderu przy każdym zapytaniu
+    if retention is not None:
+        return retention.frame_count()
     try:
         files = os.listdir(output_folder)
         return len([f for f in files if f.endswith('.jpg')])
@@ -143,15 +216,36 @@ def get_timelapse_info():
         return 0
 
 def update_measurements():
+    seq = 0
     while True:
         temp, hum = get_dht11_data()
+        seq += 1
         measurements.append({
+            'seq': seq,  # Panel pobiera tylko punkty z seq większym niż ostatni
             'timestamp': datetime.now().strftime('%H:%M:%S'),
             'temperature': temp,
             'humidity': hum
         })
+        history.append('sensor', temperature=temp, humidity=hum)
         time.sleep(2)
 
+def latest_measurement():
+    # Ostatni odczyt z wątku pomiarów - /data nie czyta czujnika przy każdym zapytaniu
+    if measurements:
+        last = measurements[-1]
+        return last['temperature'], last['humidity']
+    return get_dht11_data()
+
+def stamp(frame):
+    # Atlas znaków budowany raz dla każdej rozdzielczości, potem tylko zmienione znaki
+    key = (frame.shape[1], frame.shape[2])
+    overlay = overlays.get(key)
+    if overlay is None:
+        overlay = overlays[key] = overlay_for_frame(frame.shape[1], channels=frame.shape[2])
+    temp, hum = latest_measurement()
+    overlay.set_text(sensor_text(temp, hum))
+    overlay.apply(frame)
+
 def generate_preview():
     while True:
         try:
@@ -159,6 +253,8 @@ def generate_preview():
                 picam2.configure(preview_config)
                 picam2.start()
                 im = picam2.capture_array()
+                if args.overlay:
+                    stamp(im)
                 frame = cv2.imencode('.jpg', im)[1].tobytes()
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
@@ -178,27 +274,94 @@ def video_feed():
 
 @app.route('/data')
 def data():
-    temp, hum = get_dht11_data()
-    return json.dumps({
+    temp, hum = latest_measurement()
+    result = {
         'temperature': temp,
         'humidity': hum,
         'photo_count': get_timelapse_info(),
         'current_time': datetime.now().strftime('%H:%M:%S')
-    })
+    }
+    if daynight is not None:
+        result['night_mode'] = daynight.is_night
+        result['frames_skipped'] = daynight.frames_skipped
+        result['seconds_saved'] = round(daynight.seconds_saved)
+    return json.dumps(result)
+
+@app.route('/frames')
+def frames():
+    page = max(request.args.get('page', 0, type=int), 0)
+    size = min(max(request.args.get('size', 50, type=int), 1), 200)
+    total, names = frame_index.page(page, size)
+    return Response(json.dumps({
+        'total': total,
+        'page': page,
+        'size': size,
+        'frames': [{
+            'name': name,
+            'thumbnail': f'/thumbnail/{name}',
+            'photo': f'/photo/{name}'
+        } for name in names]
+    }), mimetype='application/json')
+
+@app.route('/thumbnail/<name>')
+def thumbnail(name):
+    if name not in frame_index:
+        abort(404)
+    try:
+        data, mtime = thumbnails.get(name)
+    except (OSError, ValueError):
+        abort(404)
+    response = Response(data, mimetype='image/jpeg')
+    response.set_etag(f'{name}-{mtime}')
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response.make_conditional(request)
+
+@app.route('/photo/<name>')
+def photo(name):
+    if name not in frame_index:
+        abort(404)
+    return send_from_directory(output_folder, name, max_age=86400)
+
+@app.route('/export')
+def export():
+    # Strumień wierszy prosto z plików historii - stała ilość pamięci dla dowolnego zakresu.
+    # Po przerwaniu: kolejne zapytanie z cursor=<timestamp ostatniego wiersza>
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        abort(400)
+    try:
+        start = parse_time(request.args.get('from'), 0)
+        end = parse_time(request.args.get('to'), time.time() + 1)
+        cursor = parse_time(request.args.get('cursor'), None)
+    except ValueError:
+        abort(400)
+    compress = (request.args.get('gzip') == '1'
+                or 'gzip' in request.headers.get('Accept-Encoding', ''))
+    response = Response(export_stream(iter_lines(args.history, start, end, cursor), fmt, compress),
+                        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Content-Disposition'] = f'attachment; filename=history.{fmt}'
+    return response
 
 @app.route('/graph-data')
 def graph_data():
-    df = pd.DataFrame(list(measurements))
-    
-    if len(df) > 0:
-        temp_fig = px.line(df, x='timestamp', y='temperature', title='Temperatura')
-        hum_fig = px.line(df, x='timestamp', y='humidity', title='Wilgotność')
-        
-        return json.dumps({
-            'temp_graph': temp_fig.to_dict(),
-            'hum_graph': hum_fig.to_dict()
-        })
-    return json.dumps({})
+    # Tylko nowe punkty - wykres w przeglądarce dopisuje je do istniejących
+    since = request.args.get('since', 0, type=int)
+    points = list(measurements)
+    newest = points[-1]['seq'] if points else 0
+    # seq liczy od 1 po restarcie serwera - wtedy całość, przeglądarka czyści wykres
+    reset = since > newest
+    if not reset:
+        points = [m for m in points if m['seq'] > since]
+    return json.dumps({
+        'reset': reset,
+        'last': points[-1]['seq'] if points else (0 if reset else since),
+        't': [m['timestamp'] for m in points],
+        'temperature': [m['temperature'] for m in points],
+        'humidity': [m['humidity'] for m in points]
+    })
 
 # Szablon HTML z wykresami i podglądem
 HTML_TEMPLATE = """
@@ -207,77 +370,8 @@ HTML_TEMPLATE = """
 <head>
     <title>Raspberry Pi Monitor</title>
     <meta charset="utf-8">
-    <style>
-        body { 
-            font-family: Arial, sans-serif; 
-            margin: 20px; 
-            background-color: #f0f0f0;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        .camera-view {
-            text-align: center;
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-        .stat-box {
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            text-align: center;
-        }
-        .graph {
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        img {
-            max-width: 100%;
-            border-radius: 5px;
-        }
-        h1, h2 { color: #333; }
-        .value { 
-            font-size: 24px; 
-            font-weight: bold;
-            color: #2196F3;
-        }
-    </style>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-    <script>
-        function updateData() {
-            fetch('/data')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('temp').innerText = data.temperature.toFixed(1) + '°C';
-                    document.getElementById('hum').innerText = data.humidity.toFixed(1) + '%';
-                    document.getElementById('photos').innerText = data.photo_count;
-                    document.getElementById('time').innerText = data.current_time;
-                });
-        }
-
-        function updateGraphs() {
-            fetch('/graph-data')
-                .then(response => response.json())
-                .then(data => {
-                    Plotly.newPlot('temp-graph', data.temp_graph);
-                    Plotly.newPlot('hum-graph', data.hum_graph);
-                });
-        }
-
-        setInterval(updateData, 1000);
-        setInterval(updateGraphs, 10000);
-    </script>
+    <link rel="stylesheet" href="{{ asset_url('dashboard.css') }}">
+    <script src="{{ asset_url('dashboard.js') }}" defer></script>
 </head>
 <body>
     <div class="container">
@@ -309,12 +403,20 @@ HTML_TEMPLATE = """
 
         <div class="graph">
             <h2>Wykres Temperatury</h2>
-            <div id="temp-graph"></div>
+            <canvas id="temp-graph"></canvas>
         </div>
 
         <div class="graph">
             <h2>Wykres Wilgotności</h2>
-            <div id="hum-graph"></div>
+            <canvas id="hum-graph"></canvas>
+        </div>
+
+        <div class="graph">
+            <h2>Zdjęcia</h2>
+            <button onclick="changeFramesPage(-1)">&laquo; Nowsze</button>
+            <span id="frames-page">-</span>
+            <button onclick="changeFramesPage(1)">Starsze &raquo;</button>
+            <div class="gallery" id="gallery"></div>
         </div>
     </div>
 </body>
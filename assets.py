@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+import os
+
+from flask import Response, request, abort
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Optional - gzip is always available
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+MIMETYPES = {
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+}
+ONE_YEAR = 365 * 24 * 3600
+
+
+class Asset:
+    """A static file with its gzip/brotli variants, compressed once at startup."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.version = hashlib.sha1(self.data).hexdigest()[:10]
+        self.mimetype = MIMETYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+        self.variants = {'gzip': gzip.compress(self.data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(self.data, quality=11)
+
+    def pick(self, accept_encoding):
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.variants:
+                return encoding, self.variants[encoding]
+        return None, self.data
+
+
+def load_assets():
+    assets = {}
+    for name in os.listdir(ASSET_DIR):
+        if os.path.splitext(name)[1] in MIMETYPES:
+            assets[name] = Asset(os.path.join(ASSET_DIR, name))
+    return assets
+
+
+def register_assets(app):
+    """Adds /assets/<name> and asset_url() for templates.
+
+    URLs carry the content hash (?v=...), so the browser may keep the files
+    for a year and fetches them again only after they change.
+    """
+    assets = load_assets()
+
+    @app.route('/assets/<name>')
+    def asset(name):
+        item = assets.get(name)
+        if item is None:
+            abort(404)
+        encoding, body = item.pick(request.headers.get('Accept-Encoding', ''))
+        response = Response(body, mimetype=item.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(f'{item.version}-{encoding or "identity"}')
+        response.cache_control.public = True
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+        return response.make_conditional(request)
+
+    @app.context_processor
+    def asset_helpers():
+        def asset_url(name):
+            return f'/assets/{name}?v={assets[name].version}'
+        return {'asset_url': asset_url}
+
+    return assets
@@ -0,0 +1,136 @@
+import os
+import resource
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+from picamera2 import MappedArray
+
+from metadata import capture_info, exif_segment, insert_segment
+
+MB = 1024 * 1024
+DEFAULT_MAX_BYTES = 200 * MB  # Leaves room for the OS on a 512MB board
+
+
+class BurstCapture:
+    """Captures N frames from the running camera into preallocated memory.
+
+    The camera keeps its current configuration. Each frame is copied from
+    the camera buffer straight into a slot of one preallocated array (no
+    per-frame allocation), JPEG encoding and file writes happen later in a
+    separate thread. The request metadata of each frame is kept next to its
+    slot, so the written JPEGs carry the same EXIF fields as single stills.
+    """
+
+    def __init__(self, picam2, max_bytes=DEFAULT_MAX_BYTES):
+        self.picam2 = picam2
+        self.max_bytes = max_bytes
+        self.buffers = None
+        self.metadata = []
+        self.times = []
+        self.writer = None
+
+    def frame_shape(self):
+        config = self.picam2.camera_config['main']
+        w, h = config['size']
+        channels = 4 if config['format'].startswith('X') else 3
+        return h, w, channels
+
+    def allocate(self, count):
+        shape = self.frame_shape()
+        frame_bytes = shape[0] * shape[1] * shape[2]
+        limit = max(self.max_bytes // frame_bytes, 1)
+        if count > limit:
+            print(f"Burst: {count} frames need {count * frame_bytes // MB} MB, "
+                  f"limited to {limit} frames ({self.max_bytes // MB} MB)")
+            count = limit
+        # Reuse the buffers between bursts if they are big enough
+        if self.buffers is None or len(self.buffers) < count or self.buffers.shape[1:] != shape:
+            self.buffers = None  # Free the old array before allocating the new one
+            self.buffers = np.empty((count,) + shape, dtype=np.uint8)
+        self.metadata = [None] * count
+        self.times = [0.0] * count
+        return count
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def capture(self, count, fps):
+        # The previous burst lives in the same buffers, it has to be written first
+        self.wait()
+        count = self.allocate(count)
+        period = 1.0 / fps
+        dropped = 0
+
+        started = time.time()
+        next_slot = started
+        for i in range(count):
+            now = time.time()
+            if now < next_slot:
+                time.sleep(next_slot - now)
+            elif now > next_slot + period:
+                # Fell behind - count the slots that were missed
+                missed = int((now - next_slot) / period)
+                dropped += missed
+                next_slot += missed * period
+            request = self.picam2.capture_request()
+            try:
+                self.metadata[i] = request.get_metadata()
+                self.times[i] = time.time()
+                with MappedArray(request, 'main') as m:
+                    h, w, c = self.buffers.shape[1:]
+                    np.copyto(self.buffers[i], m.array[:h, :w, :c])
+            finally:
+                request.release()
+            next_slot += period
+        elapsed = time.time() - started
+
+        return {
+            'frames': count,
+            'dropped': dropped,
+            'fps': count / elapsed if elapsed > 0 else 0.0,
+            'target_fps': fps,
+            'buffer_mb': self.buffers[:count].nbytes / MB,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+    def write_async(self, result, output_dir, prefix, quality=90, on_written=None):
+        self.writer = threading.Thread(
+            target=self.write, args=(result, output_dir, prefix, quality, on_written),
+            daemon=True)
+        self.writer.start()
+        return self.writer
+
+    def write(self, result, output_dir, prefix, quality=90, on_written=None):
+        # picamera2 'BGR888' arrays hold pixels in RGB order for OpenCV
+        swap = self.picam2.camera_config['main']['format'] in ('BGR888', 'XBGR8888')
+        started = time.time()
+        for i in range(result['frames']):
+            frame = self.buffers[i]
+            if frame.shape[2] == 4:
+                frame = frame[:, :, :3]
+            if swap:
+                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            ok, data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                print(f"Burst: could not encode frame {i}")
+                continue
+            # EXIF goes into the encoded bytes, the file is still written once
+            info = capture_info(self.metadata[i], now=datetime.fromtimestamp(self.times[i]))
+            jpeg = insert_segment(data.tobytes(), exif_segment(info, self.metadata[i]))
+            filename = os.path.join(output_dir, f"{prefix}_{i:03d}.jpg")
+            with open(filename, 'wb') as f:
+                f.write(jpeg)
+            if on_written:
+                on_written(filename)
+        print(f"Burst: {result['frames']} photos written in {time.time() - started:.1f} s")
+
+
+def format_report(result):
+    return (f"Burst: {result['frames']} frames at {result['fps']:.1f} fps "
+            f"(target {result['target_fps']:g}), dropped {result['dropped']}, "
+            f"buffers {result['buffer_mb']:.0f} MB, peak memory {result['peak_rss_mb']:.0f} MB")
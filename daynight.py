@@ -0,0 +1,135 @@
+import time
+
+# Thresholds on the lores frame mean (0-255) used when the sensor tuning
+# does not report Lux in the metadata
+NIGHT_LUMA = 20
+DAY_LUMA = 35
+# Size of the lores stream the apps configure for probe_brightness()
+PROBE_SIZE = (320, 180)
+
+
+def probe_brightness(picam2):
+    """Cheap scene brightness probe on the running stream.
+
+    Returns ('lux', value) from the frame metadata when available, otherwise
+    ('luma', mean) from the small 'lores' stream (YUV420, only the Y plane is
+    read). Without a lores stream returns (None, None) - reading the full
+    resolution main stream on every interval is not worth it. No still
+    capture is made.
+    """
+    metadata = picam2.capture_metadata()
+    lux = metadata.get('Lux')
+    if lux is not None:
+        return 'lux', float(lux)
+    lores = picam2.camera_config.get('lores')
+    if lores is None:
+        return None, None
+    w, h = lores['size']
+    im = picam2.capture_array('lores')
+    return 'luma', float(im[:h:4, :w:4].mean())
+
+
+class DayNightPolicy:
+    """Decides if a full still is worth taking, with hysteresis.
+
+    Night starts when brightness drops below night_lux and ends only when it
+    rises above day_lux, so a passing cloud at dusk does not flip the mode
+    on every shot. At night a still is taken every night_interval seconds
+    (never, if None), optionally with a fixed long exposure.
+    """
+
+    def __init__(self, night_lux=5.0, day_lux=15.0, night_interval=600,
+                 night_exposure=None, night_gain=8.0):
+        self.night_lux = night_lux
+        self.day_lux = day_lux
+        self.night_interval = night_interval
+        self.night_exposure = night_exposure  # microseconds
+        self.night_gain = night_gain
+        self.is_night = False
+        self.last_capture = 0
+        self.frames_skipped = 0
+        self.seconds_saved = 0.0
+        self.capture_time = 0.0  # running average of a full still
+
+    def update(self, kind, value):
+        if kind is None:
+            return self.is_night  # No reading - keep the current mode
+        if kind == 'lux':
+            night, day = self.night_lux, self.day_lux
+        else:
+            night, day = NIGHT_LUMA, DAY_LUMA
+        if not self.is_night and value < night:
+            self.is_night = True
+            print(f"Night mode on ({kind} {value:.1f}), {self.report()}")
+        elif self.is_night and value > day:
+            self.is_night = False
+            print(f"Day mode on ({kind} {value:.1f}), {self.report()}")
+        return self.is_night
+
+    def should_capture(self, now=None):
+        now = now or time.time()
+        if not self.is_night:
+            return True
+        if self.night_interval is not None and now - self.last_capture >= self.night_interval:
+            return True
+        self.frames_skipped += 1
+        self.seconds_saved += self.capture_time
+        return False
+
+    def record_capture(self, duration, now=None):
+        self.last_capture = now or time.time()
+        if self.capture_time:
+            self.capture_time = 0.8 * self.capture_time + 0.2 * duration
+        else:
+            self.capture_time = duration
+
+    def night_controls(self):
+        if not self.is_night or not self.night_exposure:
+            return None
+        return {
+            'AeEnable': False,
+            'ExposureTime': int(self.night_exposure),
+            'AnalogueGain': self.night_gain,
+            'FrameDurationLimits': (int(self.night_exposure), int(self.night_exposure)),
+        }
+
+    def report(self):
+        return f"skipped {self.frames_skipped} frames, saved {self.seconds_saved:.0f} s"
+
+
+def apply_night_controls(picam2, controls):
+    # Fixed long exposure; the sensor needs a few frames to settle
+    picam2.set_controls(controls)
+    time.sleep(3 * controls['ExposureTime'] / 1e6 + 0.5)
+
+
+def restore_auto_controls(picam2):
+    limits = picam2.camera_controls.get('FrameDurationLimits')
+    controls = {'AeEnable': True}
+    if limits:
+        controls['FrameDurationLimits'] = (limits[0], limits[1])
+    picam2.set_controls(controls)
+
+
+def add_daynight_arguments(parser):
+    parser.add_argument('--day-night', action='store_true',
+                        help='Probe scene brightness before each photo and slow down at night')
+    parser.add_argument('--night-lux', type=float, default=5.0,
+                        help='Switch to night mode below this lux (default: 5)')
+    parser.add_argument('--day-lux', type=float, default=15.0,
+                        help='Switch back to day mode above this lux (default: 15)')
+    parser.add_argument('--night-interval', type=int, default=600,
+                        help='Seconds between photos at night, 0 = no photos (default: 600)')
+    parser.add_argument('--night-exposure', type=float, default=None,
+                        help='Fixed exposure at night in milliseconds (default: auto)')
+
+
+def daynight_from_args(args):
+    if not args.day_night:
+        return None
+    return DayNightPolicy(
+        night_lux=args.night_lux,
+        day_lux=args.day_lux,
+        night_interval=args.night_interval or None,
+        night_exposure=args.night_exposure * 1000 if args.night_exposure else None,
+    )
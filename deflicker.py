@@ -0,0 +1,155 @@
+import os
+import subprocess
+from collections import deque
+
+import cv2
+import numpy as np
+
+LUMA_LOG = 'luminance.csv'
+MIN_GAIN = 0.5
+MAX_GAIN = 2.0
+
+
+def measure_luminance(path):
+    # 8x reduced grayscale decode (DCT domain) - a 288x162 luma grid for 2304x1296
+    im = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if im is None:
+        return None
+    return float(im.mean())
+
+
+def record_luminance(output_dir, path):
+    # Called right after capture, the file is still in the page cache
+    luma = measure_luminance(path)
+    if luma is not None:
+        with open(os.path.join(output_dir, LUMA_LOG), 'a') as f:
+            f.write(f"{os.path.basename(path)},{luma:.3f}\n")
+    return luma
+
+
+def read_luminance(output_dir):
+    # (name, luma) in the order the frames were captured
+    try:
+        f = open(os.path.join(output_dir, LUMA_LOG))
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            name, _, value = line.strip().partition(',')
+            try:
+                yield name, float(value)
+            except ValueError:
+                continue
+
+
+def match_luminance(output_dir, photos):
+    """Yield (path, luma) for sorted photos, reading luminance.csv alongside.
+
+    The log is appended in capture order, which is also the sorted name
+    order, so both are walked together like a merge: log rows of deleted
+    photos are skipped, photos missing from the log are measured. Only the
+    current row is held in memory.
+    """
+    log = read_luminance(output_dir)
+    row = next(log, None)
+    for name in photos:
+        while row is not None and row[0] < name:
+            row = next(log, None)
+        path = os.path.join(output_dir, name)
+        if row is not None and row[0] == name:
+            luma = row[1]
+        else:
+            luma = measure_luminance(path)
+        if luma is not None:
+            yield path, luma
+
+
+def deflicker_gains(items, window=15):
+    """Yield (path, gain) for (path, luma) items using a centered rolling mean.
+
+    Only `window` luminance values are kept at a time, so it works the
+    same for 100 and 100000 frames.
+    """
+    half = window // 2
+    buf = deque()
+    total = 0.0
+    start = 0    # index of buf[0]
+    emitted = 0  # next frame to yield
+
+    def emit(k):
+        path, luma = buf[k - start]
+        if luma < 1.0:
+            return path, 1.0
+        gain = (total / len(buf)) / luma
+        return path, min(max(gain, MIN_GAIN), MAX_GAIN)
+
+    last = -1
+    for last, item in enumerate(items):
+        buf.append(item)
+        total += item[1]
+        while last >= emitted + half:
+            while start < emitted - half:
+                total -= buf.popleft()[1]
+                start += 1
+            yield emit(emitted)
+            emitted += 1
+
+    while emitted <= last:
+        while start < emitted - half:
+            total -= buf.popleft()[1]
+            start += 1
+        yield emit(emitted)
+        emitted += 1
+
+
+def apply_gain(im, gain, lut_cache={}):
+    # 256-entry lookup table instead of float math on every pixel
+    key = round(gain, 3)
+    lut = lut_cache.get(key)
+    if lut is None:
+        if len(lut_cache) > 512:
+            lut_cache.clear()
+        lut = np.clip(np.arange(256, dtype=np.float32) * key, 0, 255).astype(np.uint8)
+        lut_cache[key] = lut
+    return cv2.LUT(im, lut, dst=im)
+
+
+def create_deflickered_video(output_dir, photos, video_name, framerate=24, window=15):
+    """Encode photos with ffmpeg, applying the deflicker gain on the way.
+
+    Frames are decoded one at a time and written as raw BGR to ffmpeg's
+    stdin, so only a single full resolution image is in memory.
+    """
+    proc = None
+    size = None
+    count = 0
+    try:
+        for path, gain in deflicker_gains(match_luminance(output_dir, photos), window):
+            im = cv2.imread(path)
+            if im is None:
+                continue
+            if proc is None:
+                size = (im.shape[1], im.shape[0])
+                cmd = [
+                    'ffmpeg', '-y',
+                    '-f', 'rawvideo',
+                    '-pix_fmt', 'bgr24',
+                    '-s', f'{size[0]}x{size[1]}',
+                    '-framerate', str(framerate),
+                    '-i', '-',
+                    '-c:v', 'libx264',
+                    '-pix_fmt', 'yuv420p',
+                    video_name
+                ]
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+            elif (im.shape[1], im.shape[0]) != size:
+                im = cv2.resize(im, size)
+            proc.stdin.write(apply_gain(im, gain).data)
+            count += 1
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            returncode = proc.wait()
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, 'ffmpeg')
+    return count
@@ -0,0 +1,224 @@
+from flask import Flask, Response, request, abort, send_file
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+app = Flask(__name__)
+
+work_dir = 'encode_jobs'
+batches = {}
+batches_lock = threading.Lock()
+encode_lock = threading.Lock()  # One ffmpeg at a time
+
+NAME_RE = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def check_name(name):
+    if not NAME_RE.match(name) or name.startswith('.'):
+        abort(400)
+    return name
+
+
+class Batch:
+    def __init__(self, batch_id, fps=24):
+        self.batch_id = batch_id
+        self.fps = fps
+        self.dir = os.path.join(work_dir, batch_id)
+        self.frames = []
+        self.status = 'receiving'
+        self.error = None
+        os.makedirs(self.dir, exist_ok=True)
+
+    @property
+    def video(self):
+        return os.path.join(self.dir, f'{self.batch_id}.mp4')
+
+    def partial(self, name):
+        return os.path.join(self.dir, name + '.part')
+
+    def info(self):
+        return {
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'frames': len(self.frames),
+            'error': self.error,
+            'video_url': f'/batches/{self.batch_id}/video' if self.status == 'done' else None,
+        }
+
+    def encode(self):
+        list_file = os.path.join(self.dir, 'frames.txt')
+        with open(list_file, 'w') as f:
+            for name in self.frames:
+                f.write(f"file '{name}'\n")
+                f.write(f"duration {1 / self.fps:.6f}\n")
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0',
+            '-i', list_file,
+            '-c:v', 'libx264',
+            '-pix_fmt', 'yuv420p',
+            self.video
+        ]
+        try:
+            with encode_lock:
+                subprocess.run(cmd, check=True)
+            self.status = 'done'
+            # Frames are not needed once the segment exists
+            for name in self.frames:
+                os.remove(os.path.join(self.dir, name))
+            print(f"Encoded {self.batch_id}: {len(self.frames)} frames")
+        except (subprocess.CalledProcessError, OSError) as e:
+            self.status = 'error'
+            self.error = str(e)
+            print(f"Error encoding {self.batch_id}: {e}")
+
+
+def get_batch(batch_id):
+    with batches_lock:
+        batch = batches.get(batch_id)
+    if batch is None:
+        abort(404)
+    return batch
+
+
+def json_response(data, status=200):
+    return Response(json.dumps(data), status=status, mimetype='application/json')
+
+
+@app.route('/batches/<batch_id>', methods=['PUT'])
+def create_batch(batch_id):
+    # Idempotent - the Pi calls it again after a reconnect
+    check_name(batch_id)
+    fps = request.args.get('fps', 24, type=int)
+    with batches_lock:
+        batch = batches.get(batch_id)
+        if batch is None:
+            batch = batches[batch_id] = Batch(batch_id, fps)
+    return json_response(batch.info())
+
+
+@app.route('/batches/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    return json_response(get_batch(batch_id).info())
+
+
+@app.route('/batches/<batch_id>', methods=['DELETE'])
+def delete_batch(batch_id):
+    batch = get_batch(batch_id)
+    with batches_lock:
+        batches.pop(batch_id, None)
+    shutil.rmtree(batch.dir, ignore_errors=True)
+    return json_response({'deleted': batch_id})
+
+
+@app.route('/batches/<batch_id>/frames/<name>', methods=['GET'])
+def frame_offset(batch_id, name):
+    # Resume point for an interrupted upload
+    batch = get_batch(batch_id)
+    check_name(name)
+    if name in batch.frames:
+        return json_response({'complete': True, 'offset': None})
+    try:
+        offset = os.path.getsize(batch.partial(name))
+    except OSError:
+        offset = 0
+    return json_response({'complete': False, 'offset': offset})
+
+
+@app.route('/batches/<batch_id>/frames/<name>', methods=['PATCH'])
+def upload_chunk(batch_id, name):
+    batch = get_batch(batch_id)
+    check_name(name)
+    if batch.status != 'receiving':
+        abort(409)
+    offset = request.args.get('offset', 0, type=int)
+    partial = batch.partial(name)
+    try:
+        size = os.path.getsize(partial)
+    except OSError:
+        size = 0
+    if offset != size:
+        return json_response({'offset': size}, status=409)
+    with open(partial, 'ab') as f:
+        while True:
+            chunk = request.stream.read(65536)
+            if not chunk:
+                break
+            f.write(chunk)
+        size = f.tell()
+    return json_response({'offset': size})
+
+
+@app.route('/batches/<batch_id>/frames/<name>/done', methods=['POST'])
+def finish_frame(batch_id, name):
+    batch = get_batch(batch_id)
+    check_name(name)
+    if name in batch.frames:
+        return json_response({'complete': True})
+    expected = request.args.get('sha256', '')
+    partial = batch.partial(name)
+    digest = hashlib.sha256()
+    try:
+        with open(partial, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+    except OSError:
+        abort(404)
+    if digest.hexdigest() != expected:
+        os.remove(partial)
+        return json_response({'complete': False, 'error': 'checksum mismatch'}, status=422)
+    os.replace(partial, os.path.join(batch.dir, name))
+    batch.frames.append(name)
+    return json_response({'complete': True})
+
+
+@app.route('/batches/<batch_id>/encode', methods=['POST'])
+def encode_batch(batch_id):
+    batch = get_batch(batch_id)
+    if batch.status in ('receiving', 'error'):
+        if not batch.frames:
+            abort(400)
+        batch.frames.sort(key=lambda n: (len(n), n))
+        batch.status = 'encoding'
+        batch.error = None
+        threading.Thread(target=batch.encode, daemon=True).start()
+    return json_response(batch.info())
+
+
+@app.route('/batches/<batch_id>/video')
+def batch_video(batch_id):
+    batch = get_batch(batch_id)
+    if batch.status != 'done':
+        abort(404)
+    return send_file(batch.video, mimetype='video/mp4')
+
+
+def load_batches():
+    # Pick up batches left from a previous run so uploads can resume
+    for batch_id in os.listdir(work_dir):
+        path = os.path.join(work_dir, batch_id)
+        if not os.path.isdir(path):
+            continue
+        batch = Batch(batch_id)
+        if os.path.exists(batch.video):
+            batch.status = 'done'
+        else:
+            batch.frames = sorted(f for f in os.listdir(path) if f.endswith('.jpg'))
+        batches[batch_id] = batch
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Encode worker for timelapse frames from Raspberry Pi')
+    parser.add_argument('-d', '--dir', default='encode_jobs', help='Working folder (default: encode_jobs)')
+    parser.add_argument('-p', '--port', type=int, default=8100, help='Port (default: 8100)')
+    args = parser.parse_args()
+
+    work_dir = args.dir
+    os.makedirs(work_dir, exist_ok=True)
+    load_batches()
+    app.run(host='0.0.0.0', port=args.port, threaded=True)
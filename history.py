@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+
+COLUMNS = ['timestamp', 'time', 'type', 'temperature', 'humidity', 'file', 'exposure_us', 'lux']
+HEADER = ','.join(COLUMNS) + '\n'
+CHUNK_SIZE = 64 * 1024
+NUMERIC = {'timestamp', 'temperature', 'humidity', 'exposure_us', 'lux'}
+
+
+class HistoryLog:
+    """Sensor readings and captures appended to one CSV file per day.
+
+    Lines are written already in export format and in time order, so an
+    export only has to pick the files of the requested days and compare the
+    first field of each line. With a sensor reading every 2 s a day is about
+    2 MB; files older than max_days are removed when a new day starts, so
+    the log does not eat the space the photo retention keeps free.
+    """
+
+    def __init__(self, folder, max_days=30):
+        self.folder = folder
+        self.max_days = max_days
+        self.lock = threading.Lock()
+        self.day = None
+        self.file = None
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, day):
+        return os.path.join(self.folder, f'{day}.csv')
+
+    def prune(self, now):
+        if not self.max_days:
+            return
+        oldest = datetime.fromtimestamp(now - self.max_days * 86400).strftime('%Y-%m-%d')
+        for name in os.listdir(self.folder):
+            if name.endswith('.csv') and name[:-4] < oldest:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError as e:
+                    print(f"History: could not remove {name}: {e}")
+
+    def append(self, kind, timestamp=None, **fields):
+        # The time is read under the lock, so lines from the sensor and capture
+        # threads land in the file in timestamp order - iter_lines() relies on it
+        with self.lock:
+            timestamp = timestamp or time.time()
+            now = datetime.fromtimestamp(timestamp)
+            values = {
+                'timestamp': f'{timestamp:.3f}',
+                'time': now.isoformat(timespec='seconds'),
+                'type': kind,
+            }
+            values.update(fields)
+            line = ','.join('' if values.get(c) is None else str(values[c]) for c in COLUMNS) + '\n'
+            day = now.strftime('%Y-%m-%d')
+            if day != self.day:
+                if self.file:
+                    self.file.close()
+                self.file = open(self.path_for(day), 'a', buffering=1)
+                self.day = day
+                self.prune(timestamp)
+            self.file.write(line)
+
+
+def parse_time(value, default):
+    # Epoch seconds or ISO date/time (2024-03-21, 2024-03-21T12:00).
+    # ValueError also for inf/nan and dates out of range, so /export can
+    # answer 400 before the stream starts.
+    if value in (None, ''):
+        return default
+    try:
+        timestamp = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    try:
+        datetime.fromtimestamp(timestamp)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError(f'time out of range: {value}')
+    return timestamp
+
+
+def iter_lines(folder, start, end, after=None):
+    """Yields stored CSV lines with start <= timestamp < end.
+
+    `after` is the resume cursor - the timestamp of the last row the client
+    already has; rows up to and including it are skipped.
+    """
+    if after is not None:
+        start = max(start, after)
+    first_day = datetime.fromtimestamp(start).strftime('%Y-%m-%d')
+    last_day = datetime.fromtimestamp(min(end, time.time())).strftime('%Y-%m-%d')
+    # One file per day, the listing stays small even after years
+    days = sorted(name[:-4] for name in os.listdir(folder) if name.endswith('.csv'))
+    for day in days:
+        if day < first_day or day > last_day:
+            continue
+        try:
+            f = open(os.path.join(folder, f'{day}.csv'))
+        except FileNotFoundError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    ts = float(line.split(',', 1)[0])
+                except ValueError:
+                    continue
+                if ts < start or (after is not None and ts <= after):
+                    continue
+                if ts >= end:
+                    return
+                yield line
+
+
+def line_to_dict(line):
+    row = {}
+    for column, value in zip(COLUMNS, line.rstrip('\n').split(',')):
+        if value == '':
+            continue
+        row[column] = float(value) if column in NUMERIC else value
+    return row
+
+
+def export_stream(lines, fmt='csv', compress=False):
+    """Turns lines into response chunks of ~64KB, optionally gzipped.
+
+    Works as a generator end to end - memory use does not depend on the
+    length of the requested range.
+    """
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buf = []
+    size = 0
+
+    def out(data):
+        data = data.encode('utf-8')
+        if gz is None:
+            return data
+        # Sync flush - whatever the client got so far can be decompressed
+        return gz.compress(data) + gz.flush(zlib.Z_SYNC_FLUSH)
+
+    if fmt == 'csv':
+        buf.append(HEADER)
+        size += len(HEADER)
+    for line in lines:
+        text = line if fmt == 'csv' else json.dumps(line_to_dict(line)) + '\n'
+        buf.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            chunk = out(''.join(buf))
+            buf = []
+            size = 0
+            if chunk:
+                yield chunk
+    chunk = out(''.join(buf)) if buf else b''
+    if gz:
+        chunk += gz.flush()
+    if chunk:
+        yield chunk
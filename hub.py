@@ -0,0 +1,364 @@
+from flask import Flask, Response, render_template_string, abort, request
+import argparse
+import http.client
+import json
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+app = Flask(__name__)
+nodes = {}
+
+BOUNDARY = b'--frame'
+STALE_AFTER = 10  # seconds without a frame/data before a node is shown as offline
+
+
+class Node:
+    """One Pi running app_monitor.py.
+
+    The hub keeps a single MJPEG stream open to the node and polls /data
+    over a keep-alive connection. Viewers are served from the cached frame
+    and data, so the Pi sees the same load for 1 or 50 viewers.
+    """
+
+    def __init__(self, name, url, data_interval=1.0):
+        parts = urlsplit(url if '://' in url else f'http://{url}')
+        self.name = name
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.url = f'http://{self.host}:{self.port}'
+        self.data_interval = data_interval
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = 0
+        self.data = {}
+        self.data_time = 0
+        self.condition = threading.Condition()
+
+    def start(self):
+        threading.Thread(target=self.stream_loop, daemon=True).start()
+        threading.Thread(target=self.data_loop, daemon=True).start()
+
+    def connect(self, timeout):
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def stream_loop(self):
+        delay = 1
+        while True:
+            conn = None
+            try:
+                conn = self.connect(timeout=15)
+                conn.request('GET', '/video_feed')
+                response = conn.getresponse()
+                if response.status != 200:
+                    raise IOError(f"HTTP {response.status}")
+                delay = 1
+                self.read_frames(response)
+            except Exception as e:
+                print(f"[{self.name}] Stream error: {e}")
+            finally:
+                if conn:
+                    conn.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 30)  # Back off on flaky Wi-Fi
+
+    def read_frames(self, response):
+        buf = b''
+        while True:
+            chunk = response.read1(65536)
+            if not chunk:
+                return
+            buf += chunk
+            while True:
+                start = buf.find(BOUNDARY)
+                if start < 0:
+                    break
+                header_end = buf.find(b'\r\n\r\n', start)
+                if header_end < 0:
+                    break
+                end = buf.find(b'\r\n' + BOUNDARY, header_end + 4)
+                if end < 0:
+                    break
+                self.set_frame(buf[header_end + 4:end])
+                buf = buf[end + 2:]
+            if len(buf) > 4 * 1024 * 1024:
+                buf = b''  # Garbage on the stream, resync on the next boundary
+
+    def set_frame(self, frame):
+        with self.condition:
+            self.frame = frame
+            self.frame_id += 1
+            self.frame_time = time.time()
+            self.condition.notify_all()
+
+    def data_loop(self):
+        conn = None
+        while True:
+            try:
+                if conn is None:
+                    conn = self.connect(timeout=5)
+                conn.request('GET', '/data')
+                response = conn.getresponse()
+                body = response.read()
+                if response.status == 200:
+                    self.data = json.loads(body)
+                    self.data_time = time.time()
+            except Exception as e:
+                print(f"[{self.name}] Data error: {e}")
+                if conn:
+                    conn.close()
+                conn = None
+            time.sleep(self.data_interval)
+
+    def wait_frame(self, last_id, timeout=5):
+        with self.condition:
+            if self.frame_id == last_id:
+                self.condition.wait(timeout)
+            return self.frame_id, self.frame
+
+    def status(self):
+        now = time.time()
+        return {
+            'name': self.name,
+            'url': self.url,
+            'online': now - max(self.frame_time, self.data_time) < STALE_AFTER,
+            'frame_age': round(now - self.frame_time, 1) if self.frame_time else None,
+            'data': self.data,
+        }
+
+
+def get_node(name):
+    node = nodes.get(name)
+    if node is None:
+        abort(404)
+    return node
+
+
+def generate_node_stream(node):
+    last_id = 0
+    while True:
+        frame_id, frame = node.wait_frame(last_id)
+        if frame is None or frame_id == last_id:
+            continue
+        last_id = frame_id
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+
+
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Raspberry Pi Hub</title>
+    <meta charset="utf-8">
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 20px;
+            background-color: #f0f0f0;
+        }
+        .grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(320px, 1fr));
+            gap: 20px;
+        }
+        .node {
+            background: white;
+            padding: 15px;
+            border-radius: 10px;
+        }
+        .node.offline { opacity: 0.5; }
+        img {
+            width: 100%;
+            border-radius: 5px;
+        }
+        h1, h2 { color: #333; }
+        h2 { font-size: 18px; margin: 0 0 10px 0; }
+        .value {
+            font-weight: bold;
+            color: #2196F3;
+        }
+    </style>
+    <script>
+        let tick = 0;
+
+        function updateNodes() {
+            tick++;
+            fetch('/nodes')
+                .then(response => response.json())
+                .then(data => {
+                    data.forEach(node => {
+                        const box = document.getElementById('node-' + node.name);
+                        box.className = node.online ? 'node' : 'node offline';
+                        const d = node.data;
+                        box.querySelector('.temp').innerText = d.temperature !== undefined ? d.temperature.toFixed(1) + '°C' : '--';
+                        box.querySelector('.hum').innerText = d.humidity !== undefined ? d.humidity.toFixed(1) + '%' : '--';
+                        box.querySelector('.photos').innerText = d.photo_count !== undefined ? d.photo_count : '--';
+                        // Grid shows snapshots - a dozen MJPEG streams would hit the browser connection limit
+                        if (node.online) {
+                            box.querySelector('img').src = '/node/' + node.name + '/frame.jpg?t=' + tick;
+                        }
+                    });
+                });
+        }
+
+        setInterval(updateNodes, 1000);
+        window.addEventListener('load', updateNodes);
+    </script>
+</head>
+<body>
+    <h1>Raspberry Pi Hub</h1>
+    <div class="grid">
+        {% for name in names %}
+        <div class="node" id="node-{{ name }}">
+            <h2><a href="/node/{{ name }}">{{ name }}</a></h2>
+            <img alt="{{ name }}" />
+            <div>
+                <span class="value temp">--</span> |
+                <span class="value hum">--</span> |
+                Zdjęcia: <span class="value photos">--</span>
+            </div>
+        </div>
+        {% endfor %}
+    </div>
+</body>
+</html>
+"""
+
+NODE_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{{ name }} - Raspberry Pi Hub</title>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f0f0; }
+        img { max-width: 100%; border-radius: 5px; }
+    </style>
+</head>
+<body>
+    <h1><a href="/">Hub</a> / {{ name }}</h1>
+    <img src="/node/{{ name }}/video_feed" />
+</body>
+</html>
+"""
+
+
+@app.route('/')
+def index():
+    return render_template_string(HTML_TEMPLATE, names=list(nodes))
+
+
+@app.route('/nodes')
+def nodes_status():
+    return Response(json.dumps([node.status() for node in nodes.values()]),
+                    mimetype='application/json')
+
+
+@app.route('/node/<name>')
+def node_page(name):
+    get_node(name)
+    return render_template_string(NODE_TEMPLATE, name=name)
+
+
+@app.route('/node/<name>/data')
+def node_data(name):
+    return Response(json.dumps(get_node(name).data), mimetype='application/json')
+
+
+@app.route('/node/<name>/frame.jpg')
+def node_frame(name):
+    node = get_node(name)
+    if node.frame is None:
+        abort(404)
+    response = Response(node.frame, mimetype='image/jpeg')
+    response.set_etag(f'{name}-{node.frame_id}')
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route('/node/<name>/video_feed')
+def node_video_feed(name):
+    return Response(generate_node_stream(get_node(name)),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+def start_standin_node(name, port):
+    """Stand-in for app_monitor.py - synthetic frames and sensor data.
+
+    Lets the hub be tried out on one machine without any cameras.
+    """
+    import cv2
+    import numpy as np
+    import random
+
+    node_app = Flask(name)
+
+    def frames():
+        while True:
+            im = np.full((300, 400, 3), 60, dtype=np.uint8)
+            cv2.putText(im, name, (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 2)
+            cv2.putText(im, datetime.now().strftime('%H:%M:%S'), (20, 150),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (33, 150, 243), 2)
+            frame = cv2.imencode('.jpg', im)[1].tobytes()
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            time.sleep(0.1)
+
+    @node_app.route('/video_feed')
+    def video_feed():
+        return Response(frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    @node_app.route('/data')
+    def data():
+        return json.dumps({
+            'temperature': 20 + random.random() * 5,
+            'humidity': 40 + random.random() * 10,
+            'photo_count': int(time.time()) % 1000,
+            'current_time': datetime.now().strftime('%H:%M:%S')
+        })
+
+    thread = threading.Thread(
+        target=lambda: node_app.run(host='127.0.0.1', port=port, threaded=True),
+        daemon=True)
+    thread.start()
+    return f'http://127.0.0.1:{port}'
+
+
+def parse_node(spec, index):
+    # "name=host:port" or just "host:port"
+    if '=' in spec:
+        name, url = spec.split('=', 1)
+    else:
+        name, url = f'pi{index + 1}', spec
+    return name, url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hub for many Raspberry Pi monitors')
+    parser.add_argument('nodes', nargs='*',
+                        help='Nodes as name=host:port or host:port (e.g. ogrod=192.168.1.20:5000)')
+    parser.add_argument('--standin', type=int, default=0,
+                        help='Start N local stand-in nodes for testing')
+    parser.add_argument('--standin-port', type=int, default=5101,
+                        help='First port for stand-in nodes (default: 5101)')
+    parser.add_argument('-p', '--port', type=int, default=8000,
+                        help='Hub port (default: 8000)')
+    parser.add_argument('--data-interval', type=float, default=1.0,
+                        help='Seconds between /data polls per node (default: 1)')
+    args = parser.parse_args()
+
+    specs = [parse_node(spec, i) for i, spec in enumerate(args.nodes)]
+    for i in range(args.standin):
+        name = f'standin{i + 1}'
+        specs.append((name, start_standin_node(name, args.standin_port + i)))
+
+    if not specs:
+        parser.error('no nodes given (use host:port arguments or --standin N)')
+
+    for name, url in specs:
+        nodes[name] = Node(name, url, data_interval=args.data_interval)
+        nodes[name].start()
+
+    app.run(host='0.0.0.0', port=args.port, threaded=True)
@@ -0,0 +1,195 @@
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# EXIF tag numbers (same values as piexif.ImageIFD / piexif.ExifIFD)
+IMAGE_DESCRIPTION = 0x010E
+EXIF_POINTER = 0x8769
+EXPOSURE_TIME = 0x829A
+ISO_SPEED = 0x8827
+DATETIME_ORIGINAL = 0x9003
+
+FIELDS = ['name', 'time', 'exposure_us', 'analogue_gain', 'digital_gain', 'lux',
+          'temperature', 'humidity', 'iso']
+
+
+def capture_info(metadata, sensor=None, now=None):
+    # Stored as JSON in ImageDescription - readable by exiftool and by read_header()
+    info = {
+        'time': (now or datetime.now()).isoformat(timespec='seconds'),
+        'exposure_us': metadata.get('ExposureTime'),
+        'analogue_gain': round(metadata.get('AnalogueGain', 0), 3),
+        'digital_gain': round(metadata.get('DigitalGain', 0), 3),
+        'lux': round(metadata['Lux'], 1) if 'Lux' in metadata else None,
+    }
+    if sensor is not None:
+        info['temperature'], info['humidity'] = sensor
+    return info
+
+
+def capture_with_metadata(picam2, filename, sensor=None, before_save=None):
+    """Captures a still and writes it with EXIF in one pass.
+
+    picamera2 builds the EXIF block (exposure, ISO, date) from the request
+    metadata while encoding; our extra fields are merged into it through
+    exif_data, so the file is written exactly once. before_save(array) may
+    draw into the camera buffer first (e.g. the text overlay).
+    """
+    request = picam2.capture_request()
+    try:
+        metadata = request.get_metadata()
+        if before_save is not None:
+            from picamera2 import MappedArray
+            with MappedArray(request, 'main') as m:
+                before_save(m.array)
+        info = capture_info(metadata, sensor)
+        exif_data = {'0th': {IMAGE_DESCRIPTION: json.dumps(info)}}
+        request.save('main', filename, exif_data=exif_data)
+    finally:
+        request.release()
+    return info
+
+
+def exif_segment(info, metadata):
+    """APP1 segment for JPEGs encoded outside picamera2 (burst frames).
+
+    Carries the same tags read_header() looks for in a still saved by
+    capture_with_metadata(): our JSON in ImageDescription plus exposure,
+    ISO and capture time in the Exif IFD.
+    """
+    import piexif  # Installed with picamera2
+    exif = {DATETIME_ORIGINAL: datetime.fromisoformat(info['time']).strftime('%Y:%m:%d %H:%M:%S')}
+    if metadata.get('ExposureTime'):
+        exif[EXPOSURE_TIME] = (int(metadata['ExposureTime']), 1000000)
+    if 'AnalogueGain' in metadata:
+        exif[ISO_SPEED] = int(metadata['AnalogueGain'] * metadata.get('DigitalGain', 1.0) * 100)
+    data = piexif.dump({'0th': {IMAGE_DESCRIPTION: json.dumps(info)}, 'Exif': exif})
+    return b'\xff\xe1' + struct.pack('>H', len(data) + 2) + data
+
+
+def insert_segment(jpeg, segment):
+    # Right after SOI, or after the JFIF APP0 header if the encoder wrote one
+    pos = 2
+    if jpeg[2:4] == b'\xff\xe0':
+        pos = 4 + struct.unpack('>H', jpeg[4:6])[0]
+    return jpeg[:pos] + segment + jpeg[pos:]
+
+
+def _read_ifd(tiff, offset, endian):
+    entries = {}
+    count = struct.unpack_from(endian + 'H', tiff, offset)[0]
+    for i in range(count):
+        pos = offset + 2 + i * 12
+        if pos + 12 > len(tiff):
+            break
+        tag, typ, n = struct.unpack_from(endian + 'HHI', tiff, pos)
+        value_pos = pos + 8
+        if typ == 2:  # ASCII
+            if n > 4:
+                value_pos = struct.unpack_from(endian + 'I', tiff, value_pos)[0]
+            entries[tag] = tiff[value_pos:value_pos + n].split(b'\0')[0].decode('ascii', 'replace')
+        elif typ == 3:  # SHORT
+            entries[tag] = struct.unpack_from(endian + 'H', tiff, value_pos)[0]
+        elif typ == 4:  # LONG
+            entries[tag] = struct.unpack_from(endian + 'I', tiff, value_pos)[0]
+        elif typ == 5:  # RATIONAL
+            value_pos = struct.unpack_from(endian + 'I', tiff, value_pos)[0]
+            num, den = struct.unpack_from(endian + 'II', tiff, value_pos)
+            entries[tag] = num / den if den else None
+    return entries
+
+
+def parse_exif(tiff):
+    endian = '<' if tiff[:2] == b'II' else '>'
+    ifd0 = _read_ifd(tiff, struct.unpack_from(endian + 'I', tiff, 4)[0], endian)
+    exif = {}
+    if EXIF_POINTER in ifd0:
+        exif = _read_ifd(tiff, ifd0[EXIF_POINTER], endian)
+    return ifd0, exif
+
+
+def read_exif_block(path):
+    """Returns the TIFF part of the EXIF APP1 segment, reading only the header.
+
+    JPEG segments are walked by their length fields; reading stops at the
+    start of the image data, so pixels are never read or decoded.
+    """
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            marker = f.read(4)
+            if len(marker) < 4 or marker[0] != 0xFF:
+                return None
+            kind = marker[1]
+            length = struct.unpack('>H', marker[2:])[0]
+            if kind == 0xDA or kind == 0xD9:  # Start of scan / end of image
+                return None
+            if kind == 0xE1:
+                data = f.read(length - 2)
+                if data[:6] == b'Exif\0\0':
+                    return data[6:]
+            else:
+                f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_header(path):
+    row = {'name': os.path.basename(path)}
+    try:
+        tiff = read_exif_block(path)
+        if tiff is None:
+            return row
+        ifd0, exif = parse_exif(tiff)
+    except (OSError, struct.error, ValueError):
+        return row
+    try:
+        info = json.loads(ifd0.get(IMAGE_DESCRIPTION, ''))
+    except ValueError:
+        info = None
+    # Other tools may store any text or JSON value there, only our object is used
+    if isinstance(info, dict):
+        row.update(info)
+    # Standard tags written by picamera2 - also present without our JSON
+    if row.get('time') is None and DATETIME_ORIGINAL in exif:
+        row['time'] = exif[DATETIME_ORIGINAL]
+    if row.get('exposure_us') is None and exif.get(EXPOSURE_TIME):
+        row['exposure_us'] = round(exif[EXPOSURE_TIME] * 1e6)
+    if ISO_SPEED in exif:
+        row['iso'] = exif[ISO_SPEED]
+    return row
+
+
+def index_folder(folder, workers=4):
+    # Threads only overlap the SD card reads, parsing is tiny
+    names = sorted((e.name for e in os.scandir(folder) if e.name.endswith('.jpg')),
+                   key=lambda n: (len(n), n))
+    paths = [os.path.join(folder, name) for name in names]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(read_header, paths)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Index of capture metadata stored in timelapse photos')
+    parser.add_argument('folder', help='Folder with photos')
+    parser.add_argument('-o', '--output', default=None, help='Output file (default: stdout)')
+    parser.add_argument('-f', '--format', choices=['csv', 'ndjson'], default='csv')
+    args = parser.parse_args()
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        if args.format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for row in index_folder(args.folder):
+                writer.writerow(row)
+        else:
+            for row in index_folder(args.folder):
+                out.write(json.dumps(row) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
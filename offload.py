@@ -0,0 +1,192 @@
+import hashlib
+import http.client
+import json
+import os
+import queue
+import socket
+import subprocess
+import threading
+import time
+from urllib.parse import urlsplit
+
+CHUNK_SIZE = 256 * 1024
+
+
+class OffloadClient:
+    """Sends timelapse frames to encode_worker.py and collects the segments.
+
+    submit() only puts the path on a queue, the capture loop never waits on
+    the network. A background thread groups frames into batches, uploads
+    them in chunks over one keep-alive connection and downloads the encoded
+    segment. After a dropped connection the upload resumes from the offset
+    the worker already has.
+    """
+
+    def __init__(self, worker_url, segment_dir, batch_size=240, fps=24, prefix=None):
+        parts = urlsplit(worker_url if '://' in worker_url else f'http://{worker_url}')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.segment_dir = segment_dir
+        self.batch_size = batch_size
+        self.fps = fps
+        self.prefix = prefix or socket.gethostname()
+        self.queue = queue.Queue()
+        self.conn = None
+        self.segments = []
+        self.flush_event = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        os.makedirs(segment_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, path):
+        self.idle.clear()
+        self.queue.put(path)
+
+    def flush(self, timeout=None):
+        # Send the unfinished batch and wait until all segments are back
+        self.idle.clear()
+        self.flush_event.set()
+        self.queue.put(None)
+        return self.idle.wait(timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+    def request_json(self, method, path, body=None, headers=None):
+        status, data = self.request(method, path, body, headers)
+        return status, json.loads(data) if data else {}
+
+    def run(self):
+        batch = []
+        while True:
+            path = self.queue.get()
+            if path is not None:
+                batch.append(path)
+            flushing = self.flush_event.is_set() and self.queue.empty()
+            if batch and (len(batch) >= self.batch_size or flushing):
+                self.send_with_retry(batch)
+                batch = []
+            if self.queue.empty() and not batch:
+                self.flush_event.clear()
+                self.idle.set()
+
+    def send_with_retry(self, batch):
+        delay = 5
+        while True:
+            try:
+                self.send_batch(batch)
+                return
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                print(f"Offload: {e}, retrying in {delay} s")
+                time.sleep(delay)
+                delay = min(delay * 2, 300)
+
+    def send_batch(self, batch):
+        first = os.path.splitext(os.path.basename(batch[0]))[0]
+        batch_id = f"{self.prefix}_{first}"
+        status, info = self.request_json('PUT', f'/batches/{batch_id}?fps={self.fps}')
+        if status != 200:
+            raise ValueError(f"cannot create batch {batch_id}: HTTP {status}")
+
+        # A retry after a lost connection may find the batch already encoded
+        if info.get('status') in ('receiving', 'error'):
+            frames = [path for path in batch if os.path.exists(path)]
+            if not frames:
+                return
+            for path in frames:
+                self.upload_frame(batch_id, path)
+            status, info = self.request_json('POST', f'/batches/{batch_id}/encode')
+        while info.get('status') == 'encoding':
+            time.sleep(2)
+            status, info = self.request_json('GET', f'/batches/{batch_id}')
+        if info.get('status') != 'done':
+            raise ValueError(f"encoding {batch_id} failed: {info.get('error')}")
+
+        segment = os.path.join(self.segment_dir, f'{batch_id}.mp4')
+        self.download(info['video_url'], segment)
+        self.request('DELETE', f'/batches/{batch_id}')
+        self.segments.append(segment)
+        print(f"Offload: segment {segment} ({len(batch)} frames)")
+
+    def upload_frame(self, batch_id, path):
+        name = os.path.basename(path)
+        url = f'/batches/{batch_id}/frames/{name}'
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        size = os.path.getsize(path)
+
+        for _ in range(3):
+            status, info = self.request_json('GET', url)
+            if info.get('complete'):
+                return
+            offset = info.get('offset') or 0
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                while offset < size:
+                    chunk = f.read(CHUNK_SIZE)
+                    status, info = self.request_json(
+                        'PATCH', f'{url}?offset={offset}', body=chunk,
+                        headers={'Content-Type': 'application/octet-stream'})
+                    if status == 409:
+                        # Worker has a different offset - continue from there
+                        offset = info['offset']
+                        f.seek(offset)
+                        continue
+                    if status != 200:
+                        raise ValueError(f"upload of {name} failed: HTTP {status}")
+                    offset = info['offset']
+            status, info = self.request_json('POST', f'{url}/done?sha256={digest.hexdigest()}')
+            if status == 200:
+                return
+            print(f"Offload: checksum mismatch for {name}, sending again")
+        raise ValueError(f"upload of {name} failed after 3 attempts")
+
+    def download(self, url, target):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.conn.request('GET', url)
+            response = self.conn.getresponse()
+            if response.status != 200:
+                response.read()
+                raise ValueError(f"download of {url} failed: HTTP {response.status}")
+            tmp = target + '.part'
+            with open(tmp, 'wb') as f:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    f.write(chunk)
+            os.replace(tmp, target)
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+
+def join_segments(segments, video_name):
+    # Segments share codec settings, so they are joined without re-encoding
+    list_file = video_name + '.txt'
+    with open(list_file, 'w') as f:
+        for segment in segments:
+            f.write(f"file '{os.path.abspath(segment)}'\n")
+    try:
+        subprocess.run([
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0',
+            '-i', list_file,
+            '-c', 'copy',
+            video_name
+        ], check=True)
+    finally:
+        os.remove(list_file)
@@ -0,0 +1,125 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+DEGREE = '°'
+
+
+class GlyphAtlas:
+    """Every printable ASCII character (and °) rendered once into a fixed cell.
+
+    Glyphs are final grey-level cells (text colour on background colour) with
+    the channel count of the frames, so putting a character on the overlay
+    is a single slice assignment. Grey works the same for RGB, BGR and XRGB.
+    """
+
+    def __init__(self, scale=1.0, thickness=2, channels=3, fg=255, bg=0):
+        self.scale = scale
+        self.thickness = thickness
+        chars = [chr(c) for c in range(32, 127)] + [DEGREE]
+        cell_w = max(cv2.getTextSize(ch, FONT, scale, thickness)[0][0] for ch in chars[:-1])
+        (_, text_h), baseline = cv2.getTextSize('Hg', FONT, scale, thickness)
+        pad = max(int(4 * scale), 2)
+        self.cell_w = cell_w + pad
+        self.cell_h = text_h + baseline + 2 * pad
+        self.glyphs = {}
+        origin = (pad // 2, pad + text_h)
+        for ch in chars:
+            cell = np.full((self.cell_h, self.cell_w), bg, dtype=np.uint8)
+            if ch == DEGREE:
+                # Hershey fonts have no degree sign
+                r = max(int(text_h / 6), 2)
+                cv2.circle(cell, (self.cell_w // 2, pad + r), r, fg, max(thickness - 1, 1), cv2.LINE_AA)
+            else:
+                cv2.putText(cell, ch, origin, FONT, scale, fg, thickness, cv2.LINE_AA)
+            # Expanded to the frame's channel count once, so stamping is a plain copy
+            self.glyphs[ch] = np.ascontiguousarray(np.repeat(cell[:, :, None], channels, axis=2))
+
+    def glyph(self, ch):
+        return self.glyphs.get(ch, self.glyphs['?'])
+
+
+class TextOverlay:
+    """Fixed-width text strip stamped into frames at (x, y).
+
+    set_text() redraws only the cells whose character changed (for a clock
+    that is usually the last digit), apply() copies the small strip into the
+    frame in place - the frame itself is never copied.
+    """
+
+    def __init__(self, atlas, max_chars, x=10, y=10):
+        self.atlas = atlas
+        self.max_chars = max_chars
+        self.x = x
+        self.y = y
+        self.text = ' ' * max_chars
+        self.strip = np.concatenate([atlas.glyph(' ')] * max_chars, axis=1)
+
+    def set_text(self, text):
+        text = text.ljust(self.max_chars)[:self.max_chars]
+        w = self.atlas.cell_w
+        for i, (old, new) in enumerate(zip(self.text, text)):
+            if old != new:
+                self.strip[:, i * w:(i + 1) * w] = self.atlas.glyph(new)
+        self.text = text
+
+    def apply(self, frame):
+        h = min(self.strip.shape[0], frame.shape[0] - self.y)
+        w = min(self.strip.shape[1], frame.shape[1] - self.x)
+        if h <= 0 or w <= 0:
+            return frame
+        frame[self.y:self.y + h, self.x:self.x + w] = self.strip[:h, :w]
+        return frame
+
+
+def sensor_text(temperature, humidity, now=None):
+    now = now or time.localtime()
+    return f"{time.strftime('%Y-%m-%d %H:%M:%S', now)} {temperature:.1f}{DEGREE}C {humidity:.0f}%"
+
+
+def overlay_for_frame(width, channels=3, max_chars=32):
+    # Text height about 3% of the frame width (2304 -> ~2.2 scale, 800 -> ~0.8)
+    scale = width / 1000
+    atlas = GlyphAtlas(scale=scale, thickness=max(int(scale * 2), 1), channels=channels)
+    margin = max(int(width * 0.01), 4)
+    return TextOverlay(atlas, max_chars, x=margin, y=margin)
+
+
+def benchmark(width=2304, height=1296, frames=200):
+    frame = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+    overlay = overlay_for_frame(width)
+    base = time.localtime()
+
+    started = time.perf_counter()
+    for i in range(frames):
+        now = time.localtime(time.mktime(base) + i)
+        overlay.set_text(sensor_text(21.5, 45, now))
+        overlay.apply(frame)
+    atlas_time = (time.perf_counter() - started) / frames
+
+    atlas = overlay.atlas
+    started = time.perf_counter()
+    for i in range(frames):
+        now = time.localtime(time.mktime(base) + i)
+        text = sensor_text(21.5, 45, now).replace(DEGREE, ' ')
+        x, y = overlay.x, overlay.y
+        cv2.rectangle(frame, (x, y), (x + overlay.strip.shape[1], y + atlas.cell_h), (0, 0, 0), -1)
+        cv2.putText(frame, text, (x, y + atlas.cell_h * 3 // 4), FONT, atlas.scale, (255, 255, 255),
+                    atlas.thickness, cv2.LINE_AA)
+    puttext_time = (time.perf_counter() - started) / frames
+
+    print(f"Frame {width}x{height}, {frames} frames")
+    print(f"Glyph atlas: {atlas_time * 1e6:8.1f} us/frame")
+    print(f"cv2.putText: {puttext_time * 1e6:8.1f} us/frame")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Overlay renderer benchmark on a synthetic frame')
+    parser.add_argument('--width', type=int, default=2304)
+    parser.add_argument('--height', type=int, default=1296)
+    parser.add_argument('-n', '--frames', type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.width, args.height, args.frames)
@@ -0,0 +1,279 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+MB = 1024 * 1024
+HOUR = 3600
+PHOTO_BYTES = 5 * MB  # room reserved per photo by make_room()
+ARCHIVE_RETRY = 600  # seconds before a failed segment is tried again
+
+
+class RetentionManager:
+    """Keeps a timelapse folder inside a byte/age budget.
+
+    The folder is scanned once at startup; after that every new photo is
+    registered with add() so the total size is tracked without listing the
+    directory again. Frames are kept in two queues ordered by capture time:
+    `recent` (newer than thin_after) and `thinned` (older frames that already
+    went through thinning, one frame per keep_every capture intervals survives).
+
+    With segment_dir set, evicted frames are encoded into video segments on
+    a background thread and deleted once the segment exists; without it
+    they are deleted right away on the caller's thread. All bookkeeping is
+    done under self.lock: add() may be called from a burst writer thread
+    while the capture loop runs make_room().
+    """
+
+    def __init__(self, output_dir, max_bytes=None, max_age=None,
+                 thin_after=24 * HOUR, keep_every=1, interval=60, min_free_bytes=500 * MB,
+                 segment_dir=None, segment_fps=24, on_remove=None):
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.thin_after = thin_after
+        self.keep_every = max(1, keep_every)
+        self.interval = max(interval, 1)
+        self.min_free_bytes = min_free_bytes
+        self.segment_dir = segment_dir
+        self.segment_fps = segment_fps
+        self.on_remove = on_remove  # e.g. drop the cached thumbnail
+
+        self.recent = deque()
+        self.thinned = deque()
+        self.paths = set()
+        self.total_bytes = 0
+        self.deleted_files = 0
+        self.freed_bytes = 0
+        self.lock = threading.Lock()
+        self.archiver = None
+        self.archive_retry_at = 0
+
+        if segment_dir:
+            os.makedirs(segment_dir, exist_ok=True)
+        self.scan()
+
+    def scan(self):
+        entries = []
+        with os.scandir(self.output_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.jpg'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        # Sort by mtime - img_1000.jpg sorts before img_999.jpg by name
+        entries.sort()
+        self.recent = deque(entries)
+        self.thinned = deque()
+        self.paths = {path for _, _, path in entries}
+        self.total_bytes = sum(size for _, size, _ in entries)
+
+    def add(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self.lock:
+            # Already tracked (e.g. from scan()) - a second entry would count
+            # the bytes twice and later delete the file by its old mtime
+            if path in self.paths:
+                return
+            self.paths.add(path)
+            self.recent.append((st.st_mtime, st.st_size, path))
+            self.total_bytes += st.st_size
+
+    def frame_count(self):
+        with self.lock:
+            return len(self.recent) + len(self.thinned)
+
+    def free_bytes(self):
+        return shutil.disk_usage(self.output_dir).free
+
+    def _remove(self, entry):
+        _, size, path = entry
+        # The entry is dropped from the accounting either way, otherwise a
+        # file that cannot be removed would keep the budget loop spinning
+        self.total_bytes -= size
+        self.paths.discard(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Retention: could not remove {path}: {e}")
+            return False
+        self.deleted_files += 1
+        self.freed_bytes += size
+        if self.on_remove:
+            self.on_remove(path)
+        return True
+
+    def _pop_oldest(self):
+        if self.thinned:
+            return self.thinned.popleft()
+        if self.recent:
+            return self.recent.popleft()
+        return None
+
+    def _restore(self, batch, from_thinned):
+        # Puts a batch taken by _pop_oldest() back in front, in the same order
+        self.recent.extendleft(reversed(batch[from_thinned:]))
+        self.thinned.extendleft(reversed(batch[:from_thinned]))
+
+    def thin(self, now=None):
+        if self.keep_every <= 1:
+            return
+        # The decision depends only on capture times: the first frame of each
+        # keep_every * interval bucket survives. Frames that survived once are
+        # alone in their bucket, so thinning again after a restart (when scan()
+        # puts them back into `recent`) keeps all of them.
+        cutoff = (now or time.time()) - self.thin_after
+        bucket_size = self.keep_every * self.interval
+        while self.recent and self.recent[0][0] < cutoff:
+            entry = self.recent.popleft()
+            bucket = int(entry[0] // bucket_size)
+            if self.thinned and int(self.thinned[-1][0] // bucket_size) == bucket:
+                self._remove(entry)
+            else:
+                self.thinned.append(entry)
+
+    def _over_budget(self, cutoff, pending=0):
+        # `pending` - bytes already picked for removal but not yet deleted.
+        # The free space reserve never removes photos: when something else
+        # fills the card, make_room() skips captures until space comes back.
+        oldest = self.thinned[0] if self.thinned else (self.recent[0] if self.recent else None)
+        if oldest is None:
+            return False
+        if self.max_bytes is not None and self.total_bytes - pending > self.max_bytes:
+            return True
+        return cutoff is not None and oldest[0] < cutoff
+
+    def _archive(self, batch):
+        # Pack evicted frames into a video segment before deleting them
+        first = datetime.fromtimestamp(batch[0][0]).strftime("%Y%m%d_%H%M%S")
+        last = datetime.fromtimestamp(batch[-1][0]).strftime("%Y%m%d_%H%M%S")
+        segment = os.path.join(self.segment_dir, f"segment_{first}_{last}.mp4")
+        list_file = os.path.join(self.segment_dir, f".segment_{first}.txt")
+        with open(list_file, 'w') as f:
+            for _, _, path in batch:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+                f.write(f"duration {1 / self.segment_fps:.6f}\n")
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0',
+            '-i', list_file,
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-pix_fmt', 'yuv420p',
+            segment
+        ]
+        try:
+            subprocess.run(cmd, check=True)
+            print(f"Retention: archived {len(batch)} frames to {segment}")
+            return True
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Retention: could not create segment {segment}: {e}")
+            return False
+        finally:
+            try:
+                os.remove(list_file)
+            except OSError:
+                pass
+
+    def enforce(self, now=None, batch_size=240):
+        now = now or time.time()
+        with self.lock:
+            if self.archiver is not None and self.archiver.is_alive():
+                # The archiver holds a batch popped from the front of the queues;
+                # thinning now could move newer frames ahead of it and a restored
+                # batch would break the capture time order
+                return
+            self.thin(now)
+            cutoff = now - self.max_age if self.max_age is not None else None
+            if not self.segment_dir:
+                while self._over_budget(cutoff):
+                    self._remove(self._pop_oldest())
+                return
+            if now < self.archive_retry_at or not self._over_budget(cutoff):
+                return
+            # Encoding a segment takes minutes on a Pi Zero - not on the capture path
+            self.archiver = threading.Thread(target=self._archive_loop,
+                                             args=(cutoff, batch_size), daemon=True)
+            self.archiver.start()
+
+    def _archive_loop(self, cutoff, batch_size):
+        while True:
+            with self.lock:
+                if not self._over_budget(cutoff):
+                    return
+                batch = []
+                pending = 0
+                from_thinned = len(self.thinned)
+                while len(batch) < batch_size and self._over_budget(cutoff, pending):
+                    entry = self._pop_oldest()
+                    batch.append(entry)
+                    pending += entry[1]
+            # ffmpeg runs without the lock, captures and add() go on meanwhile
+            archived = self._archive(batch)
+            with self.lock:
+                if not archived:
+                    # The frames are the only copy - keep them and try again later
+                    self._restore(batch, min(from_thinned, len(batch)))
+                    self.archive_retry_at = time.time() + ARCHIVE_RETRY
+                    return
+                for entry in batch:
+                    self._remove(entry)
+
+    def wait(self):
+        # Lets a running segment finish, e.g. before the app exits
+        if self.archiver is not None:
+            self.archiver.join()
+
+    def make_room(self, needed_bytes=PHOTO_BYTES):
+        # Called before each capture with the size of what is about to be
+        # written (a burst writes many photos). Returns False if even after
+        # cleanup there is no space left above the reserve for it.
+        self.enforce()
+        return self.free_bytes() >= (self.min_free_bytes or 0) + needed_bytes
+
+    def stats(self):
+        with self.lock:
+            result = {
+                'frames': len(self.recent) + len(self.thinned),
+                'bytes': self.total_bytes,
+                'deleted_files': self.deleted_files,
+                'freed_bytes': self.freed_bytes,
+            }
+        result['free_bytes'] = self.free_bytes()
+        return result
+
+
+def add_retention_arguments(parser):
+    parser.add_argument('--max-size', type=float, default=None,
+                        help='Maximum size of the photo folder in MB')
+    parser.add_argument('--max-age', type=float, default=None,
+                        help='Delete photos older than this many hours')
+    parser.add_argument('--thin-after', type=float, default=24,
+                        help='Thin photos older than this many hours (default: 24)')
+    parser.add_argument('--keep-every', type=int, default=1,
+                        help='Keep one photo per N intervals after --thin-after (default: 1, no thinning)')
+    parser.add_argument('--min-free', type=float, default=500,
+                        help='Free space reserve on the card in MB (default: 500)')
+    parser.add_argument('--segments', type=str, default=None,
+                        help='Folder for video segments of removed photos (default: just delete)')
+
+
+def retention_from_args(args, output_dir, on_remove=None):
+    return RetentionManager(
+        output_dir,
+        max_bytes=int(args.max_size * MB) if args.max_size is not None else None,
+        max_age=args.max_age * HOUR if args.max_age is not None else None,
+        thin_after=args.thin_after * HOUR,
+        keep_every=args.keep_every,
+        interval=args.interval,
+        min_free_bytes=int(args.min_free * MB),
+        segment_dir=args.segments,
+        on_remove=on_remove,
+    )
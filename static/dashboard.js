@@ -0,0 +1,168 @@
+// Panel Raspberry Pi Monitor - wykresy bez zewnętrznych bibliotek.
+// Serwer wysyła tylko nowe punkty (/graph-data?since=N), wykres je dopisuje.
+(function () {
+    const MAX_POINTS = 100;
+
+    function LineChart(canvas, color, unit) {
+        this.canvas = canvas;
+        this.color = color;
+        this.unit = unit;
+        this.labels = [];
+        this.values = [];
+    }
+
+    LineChart.prototype.push = function (label, value) {
+        this.labels.push(label);
+        this.values.push(value);
+        if (this.values.length > MAX_POINTS) {
+            this.labels.shift();
+            this.values.shift();
+        }
+    };
+
+    LineChart.prototype.clear = function () {
+        this.labels = [];
+        this.values = [];
+    };
+
+    LineChart.prototype.draw = function () {
+        const canvas = this.canvas;
+        const ratio = window.devicePixelRatio || 1;
+        const width = canvas.clientWidth;
+        const height = canvas.clientHeight;
+        if (canvas.width !== width * ratio || canvas.height !== height * ratio) {
+            canvas.width = width * ratio;
+            canvas.height = height * ratio;
+        }
+        const ctx = canvas.getContext('2d');
+        ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+        ctx.clearRect(0, 0, width, height);
+        if (this.values.length === 0) {
+            return;
+        }
+
+        const left = 50, right = 10, top = 10, bottom = 25;
+        let min = Math.min.apply(null, this.values);
+        let max = Math.max.apply(null, this.values);
+        if (max - min < 1) {
+            min -= 0.5;
+            max += 0.5;
+        }
+        const plotW = width - left - right;
+        const plotH = height - top - bottom;
+        const step = this.values.length > 1 ? plotW / (this.values.length - 1) : 0;
+        const y = v => top + plotH - (v - min) / (max - min) * plotH;
+
+        ctx.fillStyle = '#666';
+        ctx.font = '12px Arial';
+        ctx.textAlign = 'right';
+        ctx.fillText(max.toFixed(1) + this.unit, left - 5, top + 10);
+        ctx.fillText(min.toFixed(1) + this.unit, left - 5, top + plotH);
+        ctx.textAlign = 'left';
+        ctx.fillText(this.labels[0], left, height - 5);
+        ctx.textAlign = 'right';
+        ctx.fillText(this.labels[this.labels.length - 1], width - right, height - 5);
+
+        ctx.strokeStyle = '#ddd';
+        ctx.strokeRect(left, top, plotW, plotH);
+
+        ctx.strokeStyle = this.color;
+        ctx.lineWidth = 2;
+        ctx.beginPath();
+        this.values.forEach((v, i) => {
+            if (i === 0) {
+                ctx.moveTo(left, y(v));
+            } else {
+                ctx.lineTo(left + i * step, y(v));
+            }
+        });
+        ctx.stroke();
+    };
+
+    let tempChart = null;
+    let humChart = null;
+    let lastSeq = 0;
+
+    function setText(id, text) {
+        const el = document.getElementById(id);
+        if (el) {
+            el.innerText = text;
+        }
+    }
+
+    function updateData() {
+        fetch('/data')
+            .then(response => response.json())
+            .then(data => {
+                setText('temp', data.temperature.toFixed(1) + '°C');
+                setText('hum', data.humidity.toFixed(1) + '%');
+                setText('photos', data.photo_count);
+                setText('time', data.current_time);
+            });
+    }
+
+    function updateGraphs() {
+        fetch('/graph-data?since=' + lastSeq)
+            .then(response => response.json())
+            .then(data => {
+                if (data.reset) {
+                    // Serwer został uruchomiony ponownie - numeracja punktów od nowa
+                    tempChart.clear();
+                    humChart.clear();
+                    lastSeq = data.last;
+                }
+                if (!data.t || data.t.length === 0) {
+                    if (data.reset) {
+                        tempChart.draw();
+                        humChart.draw();
+                    }
+                    return;
+                }
+                data.t.forEach((t, i) => {
+                    tempChart.push(t, data.temperature[i]);
+                    humChart.push(t, data.humidity[i]);
+                });
+                lastSeq = data.last;
+                tempChart.draw();
+                humChart.draw();
+            });
+    }
+
+    // Galeria zdjęć (tylko app_monitor.py)
+    let framesPage = 0;
+    let framesPages = 1;
+
+    function loadFrames(page) {
+        fetch('/frames?page=' + page + '&size=24')
+            .then(response => response.json())
+            .then(data => {
+                framesPage = page;
+                framesPages = Math.max(Math.ceil(data.total / data.size), 1);
+                setText('frames-page', (page + 1) + ' / ' + framesPages);
+                document.getElementById('gallery').innerHTML = data.frames.map(f =>
+                    '<a href="' + f.photo + '" target="_blank">' +
+                    '<img loading="lazy" src="' + f.thumbnail + '" /><br>' + f.name + '</a>'
+                ).join('');
+            });
+    }
+
+    window.changeFramesPage = function (step) {
+        loadFrames(Math.min(Math.max(framesPage + step, 0), framesPages - 1));
+    };
+
+    window.addEventListener('load', () => {
+        tempChart = new LineChart(document.getElementById('temp-graph'), '#f44336', '°C');
+        humChart = new LineChart(document.getElementById('hum-graph'), '#2196F3', '%');
+        window.addEventListener('resize', () => {
+            tempChart.draw();
+            humChart.draw();
+        });
+        if (document.getElementById('gallery')) {
+            loadFrames(0);
+        }
+        updateData();
+        updateGraphs();
+        setInterval(updateData, 1000);
+        setInterval(updateGraphs, 10000);
+    });
+})();
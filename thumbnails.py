@@ -0,0 +1,160 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+THUMB_SIZE = (288, 162)
+CACHE_DIRNAME = '.thumbs'
+
+
+def frame_sort_key(name):
+    # img_999.jpg < img_1000.jpg, timelapse_YYYYMMDD_HHMMSS.jpg keeps its order
+    return (len(name), name)
+
+
+class FrameIndex:
+    """Sorted list of photo names in a folder.
+
+    The capture thread reports new photos with add() and retention reports
+    deletions with remove(), so the list is updated in place. The folder is
+    listed again only when its mtime changes for some other reason (files
+    copied or deleted by hand), so paging through tens of thousands of
+    frames is just slicing a list.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.names = []
+        self.known = set()
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            self.names = []
+            self.known = set()
+            self.mtime = None
+            return
+        if mtime == self.mtime:
+            return
+        with os.scandir(self.folder) as it:
+            names = [e.name for e in it if e.name.endswith('.jpg') and e.is_file()]
+        names.sort(key=frame_sort_key)
+        self.names = names
+        self.known = set(names)
+        self.mtime = mtime
+
+    def _sync_mtime(self):
+        # Our own change is already in the list - no rescan for it
+        try:
+            self.mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            self.mtime = None
+
+    def add(self, path):
+        name = os.path.basename(path)
+        with self.lock:
+            if self.mtime is None or name in self.known:
+                return
+            self.known.add(name)
+            in_order = not self.names or frame_sort_key(name) >= frame_sort_key(self.names[-1])
+            self.names.append(name)
+            if not in_order:
+                self.names.sort(key=frame_sort_key)
+            self._sync_mtime()
+
+    def remove(self, path):
+        name = os.path.basename(path)
+        with self.lock:
+            if self.mtime is None or name not in self.known:
+                return
+            self.known.discard(name)
+            self.names.remove(name)  # Retention removes the oldest - near the front
+            self._sync_mtime()
+
+    def page(self, page, size):
+        # Newest frames first
+        with self.lock:
+            self._refresh()
+            total = len(self.names)
+            end = max(total - page * size, 0)
+            start = max(end - size, 0)
+            return total, self.names[start:end][::-1]
+
+    def __contains__(self, name):
+        with self.lock:
+            self._refresh()
+            return name in self.known
+
+
+class ThumbnailCache:
+    """Thumbnails kept on disk next to the photos plus an LRU in memory.
+
+    Photos are read with cv2.IMREAD_REDUCED_COLOR_8 - libjpeg scales the
+    image down 8x in the DCT domain (2304x1296 -> 288x162), so a full
+    resolution still is never decoded.
+    """
+
+    def __init__(self, folder, size=THUMB_SIZE, memory_items=256, quality=75):
+        self.folder = folder
+        self.cache_dir = os.path.join(folder, CACHE_DIRNAME)
+        self.size = size
+        self.memory_items = memory_items
+        self.quality = quality
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def generate(self, name):
+        src = os.path.join(self.folder, name)
+        dst = os.path.join(self.cache_dir, name)
+        src_mtime = os.stat(src).st_mtime
+        try:
+            if os.stat(dst).st_mtime >= src_mtime:
+                with open(dst, 'rb') as f:
+                    return f.read(), src_mtime
+        except OSError:
+            pass
+
+        im = cv2.imread(src, cv2.IMREAD_REDUCED_COLOR_8)
+        if im is None:
+            raise ValueError(f"Cannot read {src}")
+        h, w = im.shape[:2]
+        scale = min(self.size[0] / w, self.size[1] / h, 1.0)
+        if scale < 1.0:
+            im = cv2.resize(im, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        data = cv2.imencode('.jpg', im, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1].tobytes()
+
+        tmp = dst + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, dst)
+        return data, src_mtime
+
+    def get(self, name):
+        # Returns (jpeg bytes, source mtime)
+        src_mtime = os.stat(os.path.join(self.folder, name)).st_mtime
+        with self.lock:
+            item = self.memory.get(name)
+            if item is not None and item[1] == src_mtime:
+                self.memory.move_to_end(name)
+                return item
+        item = self.generate(name)
+        with self.lock:
+            self.memory[name] = item
+            self.memory.move_to_end(name)
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+        return item
+
+    def discard(self, path):
+        name = os.path.basename(path)
+        with self.lock:
+            self.memory.pop(name, None)
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass